@@ -4,23 +4,85 @@ Network Monitor - 网络状态监测工具
 监测网络延迟，当延迟过高时记录日志
 """
 
-import subprocess
+import asyncio
+import atexit
+import locale
 import time
 import logging
 import argparse
+import copy
+import functools
 import json
-import platform
-import requests
+import random
+import re
 import os
+import sys
+import threading
+from collections import deque
 from datetime import datetime
+from logging.handlers import MemoryHandler, RotatingFileHandler
 from pathlib import Path
 from typing import List, Dict, Optional
 
+# icmplib 通过原生ICMP套接字ping，省去创建ping子进程和解析输出的开销；未安装时使用系统ping命令
+try:
+    from icmplib import async_ping as icmp_async_ping
+    from icmplib import ICMPLibError, SocketPermissionError
+except ImportError:
+    icmp_async_ping = None
+
+# orjson 解析/序列化更快，且直接读写UTF-8字节；未安装时使用标准库json
+# （orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，异常处理无需区分）
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def _json_dumps_compact(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+    def _json_dumps_compact(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+_IS_WINDOWS = sys.platform == "win32"
+
+# Windows ping输出中的延迟字段: time=XXXms 或 时间=XXXms
+_WIN_RE = re.compile(r'(?:time|时间)[=<](\d+(?:\.\d+)?)ms')
+# 只有Windows需要读取ping输出，其他系统直接丢弃，省去管道读取和解码
+_PING_STDOUT = asyncio.subprocess.PIPE if _IS_WINDOWS else asyncio.subprocess.DEVNULL
+
+# 每轮检测中目标的状态，同时作为run_monitor中处理函数表和计数列表的下标
+_UNREACHABLE, _NORMAL, _HIGH_LATENCY = 0, 1, 2
+
+# 环境变量在进程生命周期内不变，导入时读取一次
+_ENV_WEBHOOK, _ENV_CLIENT = os.getenv('DINGTALK_WEBHOOK'), os.getenv('CLIENT_NAME')
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config_cached(path: str, mtime_ns: int) -> Dict:
+    """解析配置文件，以修改时间为键缓存，文件未变化时重复创建监测器不再重新读取"""
+    with open(path, 'rb') as f:
+        return _json_loads(f.read())
+
 class NetworkMonitor:
     def __init__(self, config_file: str = "config.json"):
         self.config = self.load_config(config_file)
         self.setup_logging()
         self.last_notification_time = {}  # 记录上次通知时间，避免频繁发送
+        self._push_times = deque()  # 最近一分钟内所有通知的发送时间，用于全局限流
+        self._icmp_enabled = icmp_async_ping is not None  # 无ICMP套接字权限时会退回系统ping命令
+        self._init_derived_config()
+        # 复用HTTPS连接，持续报警时免去每次重新握手；首次发送通知时才创建
+        self._http = None
+        self._http_lock = threading.Lock()
         
     def load_config(self, config_file: str) -> Dict:
         """加载配置文件，支持环境变量覆盖敏感信息"""
@@ -34,14 +96,16 @@ class NetworkMonitor:
             "dingtalk_enabled": False, # 是否启用钉钉通知
             "notification_interval": 300,  # 通知间隔(秒)，避免频繁发送
             "client_name": "默认客户端",  # 客户端名称，用于标识不同的监测实例
+            "push_rate_per_minute": 20,  # 每分钟最多发送的通知条数（钉钉机器人限制为20条/分钟）
+            "max_workers": 0,          # 同时进行的ping数量上限，0表示与目标数相同
         }
 
         config_path = Path(config_file)
         if config_path.exists():
             try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    user_config = json.load(f)
-                    default_config.update(user_config)
+                user_config = _load_config_cached(str(config_path), config_path.stat().st_mtime_ns)
+                # 缓存的字典会被多个实例共享，复制后再合并
+                default_config.update(copy.deepcopy(user_config))
             except (json.JSONDecodeError, IOError) as e:
                 print(f"配置文件读取错误: {e}, 使用默认配置")
         else:
@@ -50,101 +114,162 @@ class NetworkMonitor:
             safe_config["dingtalk_webhook"] = "YOUR_DINGTALK_WEBHOOK_URL_HERE"
             safe_config["client_name"] = "Network Monitor Client"
 
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(safe_config, f, indent=2, ensure_ascii=False)
+            with open(config_path, 'wb') as f:
+                f.write(_json_dumps(safe_config))
             print(f"已创建默认配置文件: {config_file}")
             print("请编辑配置文件设置 DingTalk webhook 地址")
 
         # 支持环境变量覆盖敏感配置
-        env_webhook = os.getenv('DINGTALK_WEBHOOK')
-        if env_webhook:
-            default_config["dingtalk_webhook"] = env_webhook
+        # 与配置文件相同时保持原样（包括 dingtalk_enabled），使多次加载的结果一致
+        file_webhook = default_config.get("dingtalk_webhook")
+        if _ENV_WEBHOOK and _ENV_WEBHOOK != file_webhook:
+            if file_webhook and file_webhook != "YOUR_DINGTALK_WEBHOOK_URL_HERE":
+                print("警告: 环境变量 DINGTALK_WEBHOOK 覆盖了配置文件中的 dingtalk_webhook")
+            default_config["dingtalk_webhook"] = _ENV_WEBHOOK
             default_config["dingtalk_enabled"] = True
             print("使用环境变量中的 DingTalk webhook 配置")
 
-        env_client_name = os.getenv('CLIENT_NAME')
-        if env_client_name:
-            default_config["client_name"] = env_client_name
+        if _ENV_CLIENT:
+            default_config["client_name"] = _ENV_CLIENT
 
         return default_config
     
+    def update_config(self, overrides: Dict):
+        """更新配置，并重新计算由配置派生的缓存"""
+        self.config.update(overrides)
+        self._init_derived_config()
+    
+    def _init_derived_config(self):
+        """预先计算由配置派生的常量：ping命令前缀（ping时只需追加主机）和阈值文本"""
+        self._threshold_str = f"{self.config['latency_threshold']}ms"
+        
+        timeout = self.config['timeout']
+        if _IS_WINDOWS:
+            # Windows的超时参数以毫秒计
+            self._ping_cmd_prefix = ["ping", "-n", "1", "-w", str(int(timeout * 1000))]
+        else:  # Linux, macOS
+            # -n 不做反向DNS解析，-q 只输出汇总；延迟由Python侧计时，不解析输出
+            self._ping_cmd_prefix = ["ping", "-n", "-q", "-c", "1", "-W", str(int(timeout))]
+        self._subproc_timeout = timeout + 2
+    
     def setup_logging(self):
         """设置日志记录"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.config['log_file'], encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        log_format = '%(asctime)s - %(levelname)s - %(message)s'
+        
+        # 根日志器已有处理器时（GUI已配置日志，或同一进程中再次创建监测器）basicConfig不会生效，
+        # 此时不再创建新的处理器，避免每次创建监测器都留下未使用的处理器和退出回调
+        if not logging.getLogger().handlers:
+            # 日志文件按大小轮转，避免无限增长；普通日志先缓存在内存中批量写入，WARNING及以上立即落盘
+            file_handler = RotatingFileHandler(
+                self.config['log_file'], maxBytes=10_000_000, backupCount=5, encoding='utf-8', delay=True
+            )
+            file_handler.setFormatter(logging.Formatter(log_format))
+            buffered_handler = MemoryHandler(128, flushLevel=logging.WARNING, target=file_handler)
+            # 退出时写出缓冲中剩余的日志
+            atexit.register(buffered_handler.flush)
+            
+            logging.basicConfig(
+                level=logging.INFO,
+                format=log_format,
+                handlers=[
+                    buffered_handler,
+                    logging.StreamHandler()
+                ]
+            )
         self.logger = logging.getLogger(__name__)
     
-    def ping_host(self, host: str) -> Optional[float]:
+    async def ping_host_async(self, host: str) -> Optional[float]:
         """ping指定主机，返回延迟时间（毫秒）"""
+        if self._icmp_enabled:
+            try:
+                result = await icmp_async_ping(host, count=1, timeout=self.config['timeout'], privileged=False)
+                return result.avg_rtt if result.is_alive else None
+            except SocketPermissionError:
+                # 当前用户无法创建ICMP套接字（如Linux未放开ping_group_range），之后都改用系统ping命令
+                self._icmp_enabled = False
+                self.logger.info("无权限创建ICMP套接字，改用系统ping命令")
+            except ICMPLibError as e:
+                self.logger.debug(f"Ping {host} 失败: {e}")
+                return None
+
+        return await self._ping_with_command_async(host)
+
+    async def _ping_with_command_async(self, host: str) -> Optional[float]:
+        """调用系统ping命令，返回延迟时间（毫秒）"""
         try:
-            # 根据操作系统选择ping命令
-            system = platform.system().lower()
-            if system == "windows":
-                cmd = ["ping", "-n", "1", "-w", str(self.config['timeout'] * 1000), host]
-            else:  # Linux, macOS
-                cmd = ["ping", "-c", "1", "-W", str(self.config['timeout']), host]
-            
             # 执行ping命令
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.config['timeout'] + 2)
+            start = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(
+                *self._ping_cmd_prefix, host, stdout=_PING_STDOUT, stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=self._subproc_timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                self.logger.debug(f"Ping {host} 超时")
+                return None
             
-            if result.returncode == 0:
-                # 解析ping输出获取延迟时间
-                output = result.stdout
-                if system == "windows":
-                    # Windows: time=XXXms 或 时间=XXXms
-                    import re
-                    match = re.search(r'(?:time|时间)[=<](\d+(?:\.\d+)?)ms', output)
-                    if match:
-                        return float(match.group(1))
-                else:  # Linux, macOS
-                    # Linux/macOS: time=XXX ms 或 time=XXX.XXX ms
-                    import re
-                    match = re.search(r'time=(\d+(?:\.\d+)?)\s*ms', output)
-                    if match:
-                        return float(match.group(1))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            
+            if proc.returncode == 0:
+                if not _IS_WINDOWS:
+                    # 单次ping的进程耗时即往返时间（另含毫秒级的进程启动开销）
+                    return elapsed_ms
+                # Windows的ping输出受系统语言影响，仍需解析输出获取延迟时间
+                output = stdout.decode(locale.getpreferredencoding(False), errors='replace')
+                match = _WIN_RE.search(output)
+                if match:
+                    return float(match.group(1))
             
-            return None
-        except subprocess.TimeoutExpired:
-            self.logger.debug(f"Ping {host} 超时")
             return None
         except Exception as e:
             self.logger.error(f"Ping {host} 失败: {e}")
             return None
     
+    async def check_network_latency_async(self) -> Dict[str, Optional[float]]:
+        """并发检查所有目标主机的延迟"""
+        targets = self.config['targets']
+        if not targets:
+            return {}
+
+        # 所有ping在同一个事件循环中并发等待，单轮耗时取决于最慢的目标
+        limit = asyncio.Semaphore(self.config.get('max_workers') or len(targets))
+
+        async def ping_limited(target: str) -> Optional[float]:
+            async with limit:
+                return await self.ping_host_async(target)
+
+        latencies = await asyncio.gather(*(ping_limited(target) for target in targets))
+        return dict(zip(targets, latencies))
+
     def check_network_latency(self) -> Dict[str, Optional[float]]:
-        """检查所有目标主机的延迟"""
-        results = {}
-        for target in self.config['targets']:
-            latency = self.ping_host(target)
-            results[target] = latency
-        return results
+        """检查所有目标主机的延迟（同步接口，供GUI监测线程调用）"""
+        return asyncio.run(self.check_network_latency_async())
     
     def log_high_latency(self, target: str, latency: float):
         """记录高延迟事件"""
-        message = f"高延迟警告: {target} - {latency:.2f}ms (阈值: {self.config['latency_threshold']}ms)"
-        self.logger.warning(message)
+        self.logger.warning(f"高延迟警告: {target} - {latency:.2f}ms (阈值: {self._threshold_str})")
         
-        # 发送钉钉通知
+        # 被通知间隔或限流拦下时直接返回，不再拼装通知内容和格式化时间
         if self.should_send_notification(target, "high_latency"):
             client_name = self.config.get('client_name', '未知客户端')
-            self.send_dingtalk_notification(
+            self.dispatch_notification(
                 f"⚠️ 网络监测报警\n\n"
                 f"客户端: {client_name}\n"
                 f"目标: {target}\n"
                 f"状态: 高延迟警告\n"
                 f"当前延迟: {latency:.2f}ms\n"
-                f"阈值: {self.config['latency_threshold']}ms\n"
+                f"阈值: {self._threshold_str}\n"
                 f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             )
     
-    def log_unreachable(self, target: str):
-        """记录不可达事件"""
+    def _log_ok(self, target: str, latency: float):
+        """记录正常延迟；只在DEBUG级别逐条记录，每轮的汇总由run_monitor输出"""
+        self.logger.debug("%s: %.2fms (正常，低于阈值%s)", target, latency, self._threshold_str)
+    
+    def log_unreachable(self, target: str, latency: Optional[float] = None):
+        """记录不可达事件（latency恒为None，仅为与其他状态处理函数签名一致）"""
         message = f"网络不可达: {target} - 无法ping通"
         self.logger.error(message)
         
@@ -156,15 +281,36 @@ class NetworkMonitor:
         if not self.config.get('dingtalk_enabled', False):
             return False
         
-        key = f"{target}_{alert_type}"
-        now = time.time()
-        last_time = self.last_notification_time.get(key, 0)
+        key = (target, alert_type)
+        # 用单调时钟计算间隔，系统时间被校准或手动修改时不会误拦或放出大量通知
+        now = time.monotonic()
+        last_time = self.last_notification_time.get(key)
         
-        # 检查是否超过通知间隔
-        if now - last_time >= self.config.get('notification_interval', 300):
-            self.last_notification_time[key] = now
-            return True
-        return False
+        # 检查是否超过通知间隔（单调时钟起点不固定，首次通知不能用0作为上次时间）
+        if last_time is not None and now - last_time < self.config.get('notification_interval', 300):
+            return False
+        
+        # 全局限流：大面积故障时多个目标会同时报警，超过每分钟上限的通知直接丢弃
+        push_times = self._push_times
+        while push_times and now - push_times[0] >= 60:
+            push_times.popleft()
+        rate_limit = self.config.get('push_rate_per_minute', 20)
+        if len(push_times) >= rate_limit:
+            self.logger.warning(f"钉钉通知已达每分钟{rate_limit}条上限，跳过本次通知: {target}")
+            return False
+        
+        push_times.append(now)
+        self.last_notification_time[key] = now
+        return True
+    
+    def dispatch_notification(self, message: str):
+        """发送通知；在事件循环中时交给线程池执行，避免HTTP请求阻塞监测循环"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.send_dingtalk_notification(message)
+            return
+        loop.run_in_executor(None, self.send_dingtalk_notification, message)
     
     def send_dingtalk_notification(self, message: str):
         """发送钉钉通知"""
@@ -173,22 +319,19 @@ class NetworkMonitor:
             self.logger.warning("钉钉Webhook地址未配置，跳过通知")
             return
         
+        # 延迟导入requests：只做监测、从不发送通知时无需承担其导入开销
+        import requests
+        # 多条报警可能同时在线程池中发送，加锁保证只创建一个会话
+        with self._http_lock:
+            if self._http is None:
+                self._http = requests.Session()
+                self._http.headers.update({'Content-Type': 'application/json'})
+        
+        # 消息结构固定，只有content随报警变化；Content-Type已在会话上设置
+        payload = {"msgtype": "text", "text": {"content": message}}
+        
         try:
-            payload = {
-                "msgtype": "text",
-                "text": {
-                    "content": message
-                }
-            }
-            
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.post(webhook_url, 
-                                   data=json.dumps(payload), 
-                                   headers=headers, 
-                                   timeout=10)
+            response = self._http.post(webhook_url, data=_json_dumps_compact(payload), timeout=10)
             
             if response.status_code == 200:
                 result = response.json()
@@ -204,40 +347,57 @@ class NetworkMonitor:
         except Exception as e:
             self.logger.error(f"发送钉钉通知时发生错误: {e}")
     
-    def run_monitor(self):
+    async def run_monitor(self):
         """运行网络监测"""
+        # 监测开始后配置不再变化（命令行覆盖已在此之前完成），循环中直接使用局部变量
+        threshold = self.config['latency_threshold']
+        interval = self.config['check_interval']
+        targets = self.config['targets']
+        n_targets = len(targets)
+        handlers = (self.log_unreachable, self._log_ok, self.log_high_latency)
+        
         self.logger.info("开始网络监测...")
-        self.logger.info(f"监测目标: {', '.join(self.config['targets'])}")
-        self.logger.info(f"延迟阈值: {self.config['latency_threshold']}ms")
-        self.logger.info(f"检测间隔: {self.config['check_interval']}秒")
+        self.logger.info(f"监测目标: {', '.join(targets)}")
+        self.logger.info(f"延迟阈值: {self._threshold_str}")
+        self.logger.info(f"检测间隔: {interval}秒")
         
         try:
+            next_tick = time.monotonic()
             while True:
-                results = self.check_network_latency()
+                results = await self.check_network_latency_async()
                 
-                # 检查延迟和连通性
-                high_latency_count = 0
-                unreachable_count = 0
+                # 检查延迟和连通性：一次判断得到状态，再按状态分发处理并计数
+                counts = [0, 0, 0]
+                normal_latency_sum = 0.0
                 
                 for target, latency in results.items():
-                    if latency is None:
-                        self.log_unreachable(target)
-                        unreachable_count += 1
-                    elif latency > self.config['latency_threshold']:
-                        self.log_high_latency(target, latency)
-                        high_latency_count += 1
-                    else:
-                        # 正常延迟时也记录一下
-                        self.logger.info(f"{target}: {latency:.2f}ms (正常，低于阈值{self.config['latency_threshold']}ms)")
+                    status = _UNREACHABLE if latency is None else (_HIGH_LATENCY if latency > threshold else _NORMAL)
+                    counts[status] += 1
+                    handlers[status](target, latency)
+                    if status == _NORMAL:
+                        normal_latency_sum += latency
+                
+                normal_count = counts[_NORMAL]
+                if normal_count:
+                    self.logger.info(f"本轮检测: 正常 {normal_count}/{n_targets}，平均延迟 {normal_latency_sum / normal_count:.2f}ms")
                 
                 # 如果所有目标都有问题，额外记录
-                if high_latency_count + unreachable_count == len(self.config['targets']):
+                if counts[_UNREACHABLE] + counts[_HIGH_LATENCY] == n_targets:
                     self.logger.critical("网络状态异常：所有监测目标都存在问题")
                 
-                time.sleep(self.config['check_interval'])
+                # 从上一轮的计划时间起算，扣除本轮检测耗时，避免间隔逐渐漂移；
+                # 加入±10%抖动，避免同一网络中的多个监测实例总在同一时刻发包
+                next_tick += interval * random.uniform(0.9, 1.1)
+                now = time.monotonic()
+                if next_tick < now:
+                    # 本轮耗时超过检测间隔时不补跑错过的轮次
+                    next_tick = now
+                await asyncio.sleep(next_tick - now)
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # 记录后继续向上抛出，取消任务的调用方才能知道监测已被取消；Ctrl+C由main()处理
             self.logger.info("监测停止")
+            raise
         except Exception as e:
             self.logger.error(f"监测过程出错: {e}")
 
@@ -254,19 +414,30 @@ def main():
     
     args = parser.parse_args()
     
+    # 命令行日志格式用不到线程和进程信息，关闭采集以减少每条日志的开销；
+    # 这是进程级设置，只在命令行入口设置一次，不影响作为模块被GUI等导入的情况
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
     # 创建监测器
     monitor = NetworkMonitor(args.config)
     
     # 命令行参数覆盖配置文件
+    overrides = {}
     if args.threshold:
-        monitor.config['latency_threshold'] = args.threshold
+        overrides['latency_threshold'] = args.threshold
     if args.interval:
-        monitor.config['check_interval'] = args.interval
+        overrides['check_interval'] = args.interval
     if args.targets:
-        monitor.config['targets'] = args.targets
+        overrides['targets'] = args.targets
+    monitor.update_config(overrides)
     
     # 运行监测
-    monitor.run_monitor()
+    try:
+        asyncio.run(monitor.run_monitor())
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
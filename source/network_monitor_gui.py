@@ -5,27 +5,103 @@
 """
 
 import sys
+import asyncio
+import copy
 import json
+import re
 import threading
 import time
 import logging
 import requests
 import os
+from requests.adapters import HTTPAdapter
+from collections import deque
+from itertools import groupby
+from operator import itemgetter
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional, List
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QTextEdit, QSpinBox, QDoubleSpinBox,
+    QLabel, QPushButton, QTextEdit, QPlainTextEdit, QSpinBox, QDoubleSpinBox,
     QLineEdit, QGroupBox, QGridLayout, QTableWidget, QTableWidgetItem,
     QHeaderView, QMessageBox, QTabWidget, QScrollArea, QFrame
 )
-from PySide6.QtCore import QThread, Signal, QTimer, Qt
-from PySide6.QtGui import QFont, QColor, QPalette
+from PySide6.QtCore import QThread, Signal, QTimer, Qt, QMutex, QWaitCondition
+from PySide6.QtGui import QFont, QColor, QPalette, QSyntaxHighlighter, QTextCharFormat, QTextCursor
 
 # 导入原网络监测模块
-from network_monitor import NetworkMonitor
+from network_monitor import (
+    NetworkMonitor, _load_config_cached, _json_dumps, _json_dumps_compact
+)
+
+
+def _tail(path, n: int = 100, block: int = 8192, end: Optional[int] = None) -> List[str]:
+    """从文件末尾（或指定的字节位置end）按块向前读取，只解码最后n行，内存占用与日志文件大小无关"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell() if end is None else min(end, f.tell())
+        data = b''
+        # 多读到一个换行符，保证最前面被截断的半行不在返回结果中
+        while pos > 0 and data.count(b'\n') <= n:
+            read_size = min(block, pos)
+            pos -= read_size
+            f.seek(pos)
+            data = f.read(read_size) + data
+    return data.decode('utf-8', errors='replace').splitlines()[-n:]
+
+
+# 日志级别对应的显示颜色，实时日志和历史日志共用
+_LEVEL_COLORS = {"INFO": "blue", "WARNING": "orange", "ERROR": "red", "CRITICAL": "red"}
+
+# 日志文件中 "时间 - 级别 - 消息" 格式的级别字段
+_LEVEL_RE = re.compile(r" - (INFO|WARNING|ERROR|CRITICAL) - ")
+
+# 当前秒 -> (时:分:秒, 完整时间)；同一秒内的事件共用一次strftime结果
+_ts_cache: Dict[int, tuple] = {}
+
+
+def _now_strings() -> tuple:
+    """返回当前秒的两种格式化时间，每秒只调用一次strftime"""
+    t = int(time.time())
+    cached = _ts_cache.get(t)
+    if cached is None:
+        now = datetime.fromtimestamp(t)
+        full = now.strftime("%Y-%m-%d %H:%M:%S")
+        cached = (full[11:], full)
+        _ts_cache.clear()
+        _ts_cache[t] = cached
+    return cached
+
+
+def _now_hms() -> str:
+    """当前时间，格式 HH:MM:SS"""
+    return _now_strings()[0]
+
+
+def _now_full() -> str:
+    """当前时间，格式 YYYY-MM-DD HH:MM:SS"""
+    return _now_strings()[1]
+
+
+class LogHighlighter(QSyntaxHighlighter):
+    """按日志级别为实时日志行着色，代替逐行拼接HTML"""
+    LEVEL_PATTERN = re.compile(r'^\[.*?\] (ERROR|WARNING|INFO|CRITICAL):')
+    
+    def __init__(self, document):
+        super().__init__(document)
+        # 每个级别的字符格式只创建一次，加载历史日志时也直接使用
+        self.level_formats = {}
+        for level, color in _LEVEL_COLORS.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            self.level_formats[level] = fmt
+    
+    def highlightBlock(self, text):
+        match = self.LEVEL_PATTERN.match(text)
+        if match:
+            self.setFormat(0, len(text), self.level_formats[match.group(1)])
 
 
 class MonitorThread(QThread):
@@ -34,62 +110,100 @@ class MonitorThread(QThread):
     status_unreachable = Signal(str)    # 目标不可达
     log_message = Signal(str, str)      # 级别，消息
     
+    # 每个目标的日志消息模板，只在类定义时创建一次
+    _TPL_WARN = "高延迟警告: {} - {:.2f}ms (阈值: {}ms)"
+    _TPL_INFO = "{}: {:.2f}ms (正常)"
+    
     def __init__(self, config):
         super().__init__()
         self.config = config
         self.running = False
-        self.monitor = None
+        # 监测器在启动线程前创建好，run()中只负责循环检测
+        self.monitor = NetworkMonitor()
+        self.monitor.update_config(config)
+        # 检测间隔内阻塞等待，stop()时立即唤醒，无需每秒醒来检查标志
+        self._mutex = QMutex()
+        self._wake = QWaitCondition()
         
     def run(self):
         """运行监测线程"""
         self.running = True
-        self.monitor = NetworkMonitor()
-        self.monitor.config.update(self.config)
-        
-        self.log_message.emit("INFO", f"开始网络监测... 目标: {', '.join(self.config['targets'])}")
-        self.log_message.emit("INFO", f"延迟阈值: {self.config['latency_threshold']}ms")
-        self.log_message.emit("INFO", f"检测间隔: {self.config['check_interval']}秒")
         
+        # 配置在每次开始监测时传入，运行期间不变，循环中使用的值先绑定为局部变量
+        threshold = self.config['latency_threshold']
+        interval_ms = self.config['check_interval'] * 1000
+        emit_log = self.log_message.emit
+        emit_update = self.status_update.emit
+        emit_unreachable = self.status_unreachable.emit
+        check = self.monitor.check_network_latency_async
+        tpl_warn = self._TPL_WARN.format
+        tpl_info = self._TPL_INFO.format
+        # 低于 gui_log_level 的正常结果不发往界面，直接写入GUI日志文件，省去跨线程信号
+        min_level = logging.getLevelName(str(self.config.get('gui_log_level', 'INFO')).upper())
+        show_info = not isinstance(min_level, int) or logging.INFO >= min_level
+        log_info = logging.getLogger(__name__).info
+        
+        emit_log("INFO", f"开始网络监测... 目标: {', '.join(self.config['targets'])}")
+        emit_log("INFO", f"延迟阈值: {threshold}ms")
+        emit_log("INFO", f"检测间隔: {self.config['check_interval']}秒")
+        
+        # 整个线程复用一个事件循环并发ping所有目标，不必每轮重新创建和销毁循环
+        loop = asyncio.new_event_loop()
         while self.running:
             try:
                 # 检查所有目标
-                results = self.monitor.check_network_latency()
+                results = loop.run_until_complete(check())
                 
                 for target, latency in results.items():
                     if latency is None:
-                        self.status_unreachable.emit(target)
-                        self.log_message.emit("ERROR", f"网络不可达: {target}")
-                    elif latency > self.config['latency_threshold']:
-                        self.status_update.emit(target, latency)
-                        self.log_message.emit("WARNING", 
-                            f"高延迟警告: {target} - {latency:.2f}ms (阈值: {self.config['latency_threshold']}ms)")
+                        emit_unreachable(target)
+                        emit_log("ERROR", f"网络不可达: {target}")
+                    elif latency > threshold:
+                        emit_update(target, latency)
+                        emit_log("WARNING", tpl_warn(target, latency, threshold))
                     else:
-                        self.status_update.emit(target, latency)
-                        self.log_message.emit("INFO", f"{target}: {latency:.2f}ms (正常)")
+                        emit_update(target, latency)
+                        if show_info:
+                            emit_log("INFO", tpl_info(target, latency))
+                        else:
+                            log_info("%s: %.2fms (正常)", target, latency)
                 
                 # 等待下次检测
-                for i in range(self.config['check_interval']):
-                    if not self.running:
-                        break
-                    self.msleep(1000)
+                self._mutex.lock()
+                if self.running:
+                    self._wake.wait(self._mutex, interval_ms)
+                self._mutex.unlock()
                     
             except Exception as e:
-                self.log_message.emit("ERROR", f"监测过程出错: {e}")
+                emit_log("ERROR", f"监测过程出错: {e}")
                 break
                 
-        self.log_message.emit("INFO", "网络监测已停止")
+        loop.close()
+        emit_log("INFO", "网络监测已停止")
     
     def stop(self):
         """停止监测"""
+        self._mutex.lock()
         self.running = False
+        self._wake.wakeAll()
+        self._mutex.unlock()
 
 
 class NetworkMonitorGUI(QMainWindow):
     """网络监测GUI主窗口"""
+    # 状态单元格背景色只创建一次，刷新时直接复用
+    COLOR_NORMAL = QColor(200, 255, 200)
+    COLOR_HIGH_LATENCY = QColor(255, 200, 200)
+    COLOR_UNREACHABLE = QColor(255, 150, 150)
     
     def __init__(self):
         super().__init__()
         self.monitor_thread = None
+        self._last_saved_config = None  # 上次写入的配置快照和文件修改时间，内容未变时跳过写盘
+        # 复用同一个HTTP会话，多次发送通知时保持TLS连接，不必每次重新握手
+        self._http = requests.Session()
+        self._http.headers.update({'Content-Type': 'application/json'})
+        self._http.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
         self.config = self.load_config()
         self.setup_logging()
         self.init_ui()
@@ -111,9 +225,9 @@ class NetworkMonitorGUI(QMainWindow):
         config_path = Path(config_file)
         if config_path.exists():
             try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    user_config = json.load(f)
-                    default_config.update(user_config)
+                # 与NetworkMonitor共用按修改时间缓存的解析结果，复制后再合并
+                user_config = _load_config_cached(str(config_path), config_path.stat().st_mtime_ns)
+                default_config.update(copy.deepcopy(user_config))
             except (json.JSONDecodeError, IOError):
                 pass
         else:
@@ -122,8 +236,7 @@ class NetworkMonitorGUI(QMainWindow):
             safe_config["dingtalk_webhook"] = "YOUR_DINGTALK_WEBHOOK_URL_HERE"
             safe_config["client_name"] = "Network Monitor Client"
 
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(safe_config, f, indent=2, ensure_ascii=False)
+            config_path.write_bytes(_json_dumps(safe_config))
 
         # 支持环境变量覆盖敏感配置
         env_webhook = os.getenv('DINGTALK_WEBHOOK')
@@ -143,6 +256,10 @@ class NetworkMonitorGUI(QMainWindow):
         log_file = self.config.get('log_file', 'network_monitor.log')
         gui_log_file = log_file.replace('.log', '_gui.log')
         
+        # 记录启动时日志文件的大小：之后写入的行都会同时显示在实时日志中，
+        # 打开日志页面时只从这个位置之前加载历史记录，避免同一行显示两次
+        self._history_end = os.path.getsize(gui_log_file) if os.path.exists(gui_log_file) else 0
+        
         # 设置日志格式
         logging.basicConfig(
             level=logging.INFO,
@@ -154,12 +271,26 @@ class NetworkMonitorGUI(QMainWindow):
         )
         self.logger = logging.getLogger(__name__)
         self.gui_log_file = gui_log_file
+        # 日志级别 -> 记录方法，写日志时直接查表
+        self._log_dispatch = {
+            "INFO": self.logger.info,
+            "WARNING": self.logger.warning,
+            "ERROR": self.logger.error,
+            "CRITICAL": self.logger.critical,
+        }
     
     def save_config(self):
         """保存配置"""
         try:
-            with open("config.json", 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            config_path = Path("config.json")
+            snapshot = json.dumps(self.config, sort_keys=True, ensure_ascii=False)
+            # 配置未修改且文件在上次保存后没有被外部改动时，不再重写文件
+            if (self._last_saved_config and self._last_saved_config[0] == snapshot
+                    and config_path.exists() and config_path.stat().st_mtime_ns == self._last_saved_config[1]):
+                return
+            
+            config_path.write_bytes(_json_dumps(self.config))
+            self._last_saved_config = (snapshot, config_path.stat().st_mtime_ns)
         except IOError:
             QMessageBox.warning(self, "警告", "配置文件保存失败")
     
@@ -188,7 +319,11 @@ class NetworkMonitorGUI(QMainWindow):
         
         # 日志页面
         log_tab = self.create_log_tab()
-        tab_widget.addTab(log_tab, "日志查看")
+        self._log_tab_index = tab_widget.addTab(log_tab, "日志查看")
+        
+        # 历史日志在第一次切换到日志页面时才加载，不占用窗口启动时间
+        self._logs_loaded = False
+        tab_widget.currentChanged.connect(self._maybe_load_logs)
         
         # 状态栏
         self.statusBar().showMessage("就绪")
@@ -248,8 +383,19 @@ class NetworkMonitorGUI(QMainWindow):
         self.total_checks = 0
         self.high_latency_count = 0
         self.unreachable_count = 0
-        self.latency_sum = 0.0
         self.latency_count = 0
+        self._avg = 0.0            # 平均延迟，随每次结果增量更新
+        # 四个统计标签当前显示的文本，内容未变时不再调用setText
+        self._stat_cache = ["总检测次数: 0", "高延迟次数: 0", "不可达次数: 0", "平均延迟: 0.00ms"]
+        
+        # 状态更新先缓存，由定时器合并后一次性刷新到表格，避免每个信号都重绘表格
+        self._pending_status = {}  # 目标 -> (状态, 延迟文本, 检测时间, 背景色)
+        self._shown_status = {}    # 目标 -> 表格中当前显示的值，用于跳过未变化的单元格
+        self._row_by_target = {}   # 目标 -> 表格行号，在开始监测时建立
+        self._status_flush_timer = QTimer(self)
+        self._status_flush_timer.setSingleShot(True)
+        self._status_flush_timer.setInterval(250)
+        self._status_flush_timer.timeout.connect(self.flush_status_updates)
         
         return widget
     
@@ -362,11 +508,23 @@ class NetworkMonitorGUI(QMainWindow):
         log_group = QGroupBox("实时日志")
         log_layout = QVBoxLayout(log_group)
         
-        self.log_display = QTextEdit()
+        self.log_display = QPlainTextEdit()
         self.log_display.setReadOnly(True)
         self.log_display.setFont(QFont("Courier", 10))
+        self.log_display.setMaximumBlockCount(5000)  # 只保留最近的日志行，限制内存占用
+        self.log_highlighter = LogHighlighter(self.log_display.document())
         log_layout.addWidget(self.log_display)
         
+        # 实时日志和无法识别级别的历史行使用默认格式插入，避免沿用末尾历史行的颜色
+        self._plain_format = QTextCharFormat()
+        
+        # 新日志先进入缓冲区，每100ms批量追加一次，避免高频日志逐条触发排版
+        self._log_buffer = deque()
+        self._log_flush_timer = QTimer(self)
+        self._log_flush_timer.setSingleShot(True)
+        self._log_flush_timer.setInterval(100)
+        self._log_flush_timer.timeout.connect(self.flush_log_buffer)
+        
         # 日志控制
         log_control_layout = QHBoxLayout()
         clear_log_btn = QPushButton("清空显示")
@@ -378,7 +536,7 @@ class NetworkMonitorGUI(QMainWindow):
         self.auto_scroll_btn.clicked.connect(self.toggle_auto_scroll)
         
         load_log_btn = QPushButton("加载历史日志")
-        load_log_btn.clicked.connect(self.load_log_history)
+        load_log_btn.clicked.connect(lambda: self.load_log_history())
         
         save_log_btn = QPushButton("导出日志")
         save_log_btn.clicked.connect(self.export_logs)
@@ -398,9 +556,6 @@ class NetworkMonitorGUI(QMainWindow):
         
         layout.addWidget(log_group)
         
-        # 加载启动时的历史日志
-        self.load_log_history()
-        
         return widget
     
     def save_configuration(self):
@@ -467,14 +622,8 @@ class NetworkMonitorGUI(QMainWindow):
                 }
             }
             
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.post(webhook_url, 
-                                   data=json.dumps(payload), 
-                                   headers=headers, 
-                                   timeout=10)
+            # 会话已带 Content-Type: application/json，直接发送预先编码的字节
+            response = self._http.post(webhook_url, data=_json_dumps_compact(payload), timeout=10)
             
             if response.status_code == 200:
                 result = response.json()
@@ -504,11 +653,15 @@ class NetworkMonitorGUI(QMainWindow):
         self.total_checks = 0
         self.high_latency_count = 0
         self.unreachable_count = 0
-        self.latency_sum = 0.0
         self.latency_count = 0
+        self._avg = 0.0
         self.update_stats()
         
         # 清空状态表格
+        self._status_flush_timer.stop()
+        self._pending_status.clear()
+        self._shown_status.clear()
+        self._row_by_target.clear()
         self.status_table.setRowCount(0)
         
         # 初始化状态表格
@@ -519,6 +672,7 @@ class NetworkMonitorGUI(QMainWindow):
             self.status_table.setItem(row, 1, QTableWidgetItem("等待中..."))
             self.status_table.setItem(row, 2, QTableWidgetItem("-"))
             self.status_table.setItem(row, 3, QTableWidgetItem("-"))
+            self._row_by_target[target] = row
         
         # 启动监测线程
         self.monitor_thread = MonitorThread(self.config)
@@ -545,131 +699,166 @@ class NetworkMonitorGUI(QMainWindow):
         
     def update_status(self, target: str, latency: float):
         """更新目标状态"""
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        # 查找目标行
-        for row in range(self.status_table.rowCount()):
-            if self.status_table.item(row, 0).text() == target:
-                # 更新状态
-                if latency > self.config['latency_threshold']:
-                    status = "高延迟"
-                    self.status_table.item(row, 1).setBackground(QColor(255, 200, 200))
-                    self.high_latency_count += 1
-                else:
-                    status = "正常"
-                    self.status_table.item(row, 1).setBackground(QColor(200, 255, 200))
-                
-                self.status_table.setItem(row, 1, QTableWidgetItem(status))
-                self.status_table.setItem(row, 2, QTableWidgetItem(f"{latency:.2f}"))
-                self.status_table.setItem(row, 3, QTableWidgetItem(current_time))
-                break
+        current_time = _now_hms()
+        
+        if latency > self.config['latency_threshold']:
+            self._queue_status(target, "高延迟", f"{latency:.2f}", current_time, self.COLOR_HIGH_LATENCY)
+            self.high_latency_count += 1
+        else:
+            self._queue_status(target, "正常", f"{latency:.2f}", current_time, self.COLOR_NORMAL)
         
         # 更新统计
         self.total_checks += 1
-        self.latency_sum += latency
         self.latency_count += 1
-        self.update_stats()
+        self._avg += (latency - self._avg) / self.latency_count
         
     def update_unreachable(self, target: str):
         """更新不可达状态"""
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        # 查找目标行
-        for row in range(self.status_table.rowCount()):
-            if self.status_table.item(row, 0).text() == target:
-                self.status_table.setItem(row, 1, QTableWidgetItem("不可达"))
-                self.status_table.item(row, 1).setBackground(QColor(255, 150, 150))
-                self.status_table.setItem(row, 2, QTableWidgetItem("-"))
-                self.status_table.setItem(row, 3, QTableWidgetItem(current_time))
-                break
+        current_time = _now_hms()
+        self._queue_status(target, "不可达", "-", current_time, self.COLOR_UNREACHABLE)
         
         # 更新统计
         self.total_checks += 1
         self.unreachable_count += 1
+    
+    def _queue_status(self, target: str, status: str, latency_text: str, check_time: str, color: QColor):
+        """缓存目标的最新状态，等待定时器统一刷新；同一目标只保留最后一次结果"""
+        self._pending_status[target] = (status, latency_text, check_time, color)
+        if not self._status_flush_timer.isActive():
+            self._status_flush_timer.start()
+    
+    def flush_status_updates(self):
+        """把缓存的状态一次性写入表格，只更新发生变化的单元格"""
+        pending, self._pending_status = self._pending_status, {}
+        
+        for target, (status, latency_text, check_time, color) in pending.items():
+            row = self._row_by_target.get(target)
+            if row is None:
+                continue
+            shown = self._shown_status.get(target, (None, None, None))
+            
+            # 单元格在start_monitoring中已创建，这里原地修改文本，不再重新分配条目
+            if shown[0] != status:
+                status_item = self.status_table.item(row, 1)
+                status_item.setText(status)
+                status_item.setBackground(color)
+            if shown[1] != latency_text:
+                self.status_table.item(row, 2).setText(latency_text)
+            if shown[2] != check_time:
+                self.status_table.item(row, 3).setText(check_time)
+            
+            self._shown_status[target] = (status, latency_text, check_time)
+        
         self.update_stats()
         
     def update_stats(self):
         """更新统计信息"""
-        self.total_checks_label.setText(f"总检测次数: {self.total_checks}")
-        self.high_latency_count_label.setText(f"高延迟次数: {self.high_latency_count}")
-        self.unreachable_count_label.setText(f"不可达次数: {self.unreachable_count}")
-        
+        texts = [
+            f"总检测次数: {self.total_checks}",
+            f"高延迟次数: {self.high_latency_count}",
+            f"不可达次数: {self.unreachable_count}",
+        ]
+        labels = [self.total_checks_label, self.high_latency_count_label, self.unreachable_count_label]
         if self.latency_count > 0:
-            avg_latency = self.latency_sum / self.latency_count
-            self.avg_latency_label.setText(f"平均延迟: {avg_latency:.2f}ms")
+            texts.append(f"平均延迟: {self._avg:.2f}ms")
+            labels.append(self.avg_latency_label)
+        
+        # 只重设文本发生变化的标签，避免无谓的重新布局和重绘
+        cache = self._stat_cache
+        for idx, (label, text) in enumerate(zip(labels, texts)):
+            if cache[idx] != text:
+                label.setText(text)
+                cache[idx] = text
         
     def add_log_message(self, level: str, message: str):
         """添加日志消息"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = _now_full()
         log_entry = f"[{timestamp}] {level}: {message}"
         
         # 写入日志文件
         if hasattr(self, 'logger'):
-            if level == "INFO":
-                self.logger.info(message)
-            elif level == "WARNING":
-                self.logger.warning(message)
-            elif level == "ERROR":
-                self.logger.error(message)
-            elif level == "CRITICAL":
-                self.logger.critical(message)
-            else:
-                self.logger.info(message)
-        
-        # 根据级别设置颜色
-        if level == "ERROR" or level == "CRITICAL":
-            color = "red"
-        elif level == "WARNING":
-            color = "orange"
-        elif level == "INFO":
-            color = "blue"
-        else:
-            color = "black"
-            
-        self.log_display.append(f'<span style="color: {color};">{log_entry}</span>')
+            self._log_dispatch.get(level, self.logger.info)(message)
+        
+        # 颜色由LogHighlighter按级别前缀设置，这里只缓存纯文本
+        self._log_buffer.append(log_entry)
+        if not self._log_flush_timer.isActive():
+            self._log_flush_timer.start()
+    
+    def flush_log_buffer(self):
+        """把缓冲的日志一次性追加到显示区域"""
+        if not self._log_buffer:
+            return
+        text = '\n'.join(self._log_buffer)
+        self._log_buffer.clear()
+        document = self.log_display.document()
+        if not document.isEmpty():
+            text = '\n' + text
+        
+        # 整批文本一次插入，期间暂停重绘和信号，只做一次布局和绘制
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        self.log_display.setUpdatesEnabled(False)
+        self.log_display.blockSignals(True)
+        try:
+            cursor.insertText(text, self._plain_format)
+        finally:
+            self.log_display.blockSignals(False)
+            self.log_display.setUpdatesEnabled(True)
         
         # 自动滚动到底部
         if self.auto_scroll_btn.isChecked():
-            cursor = self.log_display.textCursor()
-            cursor.movePosition(cursor.MoveOperation.End)
             self.log_display.setTextCursor(cursor)
     
     def clear_logs(self):
         """清空显示的日志（不删除日志文件）"""
+        self._log_buffer.clear()
         self.log_display.clear()
         self.add_log_message("INFO", "日志显示已清空")
         
-    def load_log_history(self):
-        """加载历史日志"""
+    def _maybe_load_logs(self, index: int):
+        """第一次打开日志页面时加载历史日志"""
+        if index == self._log_tab_index and not self._logs_loaded:
+            self._logs_loaded = True
+            # 打开页面前可能已有实时日志，历史记录插到它们前面
+            self.load_log_history(prepend=True)
+    
+    def load_log_history(self, prepend: bool = False):
+        """加载历史日志，prepend为True时插入到已显示日志的前面"""
+        self.flush_log_buffer()
         try:
             if hasattr(self, 'gui_log_file') and Path(self.gui_log_file).exists():
-                with open(self.gui_log_file, 'r', encoding='utf-8') as f:
+                document = self.log_display.document()
+                cursor = QTextCursor(document)
+                cursor.movePosition(QTextCursor.MoveOperation.Start if prepend else QTextCursor.MoveOperation.End)
+                need_separator = not prepend and not document.isEmpty()
+                # 插到实时日志前面时，只读取启动前已写入文件的部分
+                end = self._history_end if prepend and not document.isEmpty() else None
+                self.log_display.setUpdatesEnabled(False)
+                try:
                     # 读取最后100行日志
-                    lines = f.readlines()
-                    recent_lines = lines[-100:] if len(lines) > 100 else lines
-                    
-                    for line in recent_lines:
+                    classified = []
+                    for line in _tail(self.gui_log_file, 100, end=end):
                         line = line.strip()
                         if line:
-                            # 解析日志级别
-                            if " - INFO - " in line:
-                                level = "INFO"
-                                color = "blue"
-                            elif " - WARNING - " in line:
-                                level = "WARNING" 
-                                color = "orange"
-                            elif " - ERROR - " in line:
-                                level = "ERROR"
-                                color = "red"
-                            elif " - CRITICAL - " in line:
-                                level = "CRITICAL"
-                                color = "red"
-                            else:
-                                level = "INFO"
-                                color = "black"
-                            
-                            self.log_display.append(f'<span style="color: {color};">{line}</span>')
-                
+                            # 解析日志级别，一次正则匹配代替逐个子串查找
+                            match = _LEVEL_RE.search(line)
+                            classified.append((match.group(1) if match else None, line))
+                    
+                    # 相邻同级别的行拼成一段文本一次插入（换行会自动拆成多个文本块），
+                    # 以纯文本加字符格式插入，省去逐行HTML解析
+                    level_formats = self.log_highlighter.level_formats
+                    for level, group in groupby(classified, key=itemgetter(0)):
+                        if need_separator:
+                            cursor.insertBlock()
+                        cursor.insertText('\n'.join(line for _, line in group),
+                                          level_formats.get(level, self._plain_format))
+                        need_separator = True
+                    # 插在已有日志前面时，与后面的第一行分开
+                    if prepend and need_separator and not cursor.atEnd():
+                        cursor.insertBlock()
+                finally:
+                    self.log_display.setUpdatesEnabled(True)
+            
                 # 滚动到底部
                 if self.auto_scroll_btn.isChecked():
                     cursor = self.log_display.textCursor()
@@ -696,6 +885,7 @@ class NetworkMonitorGUI(QMainWindow):
             
             if filename:
                 # 获取当前显示的所有日志
+                self.flush_log_buffer()
                 log_content = self.log_display.toPlainText()
                 
                 with open(filename, 'w', encoding='utf-8') as f:
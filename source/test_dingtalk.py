@@ -4,105 +4,278 @@
 用于验证钉钉Webhook集成是否正常工作
 """
 
+import asyncio
+import contextlib
+import functools
 import json
-import requests
+import os
+import re
+import socket
+import sys
+import httpx
 from datetime import datetime
+from urllib.parse import urlsplit
+from typing import Callable, List, Tuple
 
-def test_dingtalk_webhook():
-    """测试钉钉Webhook通知"""
+# 与监测程序共用按修改时间缓存的配置解析和JSON编解码（安装了orjson时使用orjson）
+from network_monitor import _load_config_cached, _json_loads, _json_dumps_compact
+
+# 安装了 h2 时启用HTTP/2，多条消息可在同一个TLS连接上并发传输
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+def load_config(path: str = 'config.json') -> dict:
+    """读取配置文件，文件未变化时直接使用缓存"""
+    return _load_config_cached(path, os.stat(path).st_mtime_ns)
+
+
+# 测试使用的客户端名称，两条消息共用同一行
+CLIENT_NAME = "测试客户端"
+CLIENT_LINE = f"客户端: {CLIENT_NAME}\n"
+
+# 测试消息中除时间以外的固定部分，只在模块加载时拼接一次
+_TEST_PREFIX = (
+    "🧪 网络监测工具测试消息\n\n"
+    f"{CLIENT_LINE}"
+    "这是一条来自网络监测工具的测试通知。\n"
+    "时间: "
+)
+_TEST_SUFFIX = (
+    "\n功能: 钉钉Webhook集成测试\n"
+    "状态: 测试正常"
+)
+_HIGH_LATENCY_PREFIX = (
+    "⚠️ 网络监测报警\n\n"
+    f"{CLIENT_LINE}"
+    "目标: 8.8.8.8\n"
+    "状态: 高延迟警告\n"
+    "当前延迟: 150.25ms\n"
+    "阈值: 100ms\n"
+    "时间: "
+)
+
+# 钉钉机器人Webhook地址格式（加签机器人可在access_token后附带其他参数）
+WEBHOOK_VALID_RE = re.compile(r'^https://oapi\.dingtalk\.com/robot/send\?access_token=[A-Za-z0-9]+(?:&\S*)?$')
+
+# 同时发送的测试消息数量上限
+MAX_CONCURRENT_SENDS = 5
+
+# 域名解析结果缓存：并发请求和后续连接共用一次DNS查询
+_orig_getaddrinfo = socket.getaddrinfo
+
+
+@functools.lru_cache(maxsize=32)
+def _resolve_cached(host, port, family, type_, proto, flags):
+    return _orig_getaddrinfo(host, port, family, type_, proto, flags)
+
+
+def _getaddrinfo_cached(host, port, family=0, type=0, proto=0, flags=0):
+    """与 socket.getaddrinfo 参数相同；统一参数形式后查缓存（解析失败的结果不缓存）"""
+    if isinstance(host, bytes):
+        host = host.decode('ascii')
+    return _resolve_cached(host, port, int(family), int(type), proto, flags)
+
+
+@contextlib.asynccontextmanager
+async def _dns_cache(host: str, port: int):
+    """在代码块内让域名解析经过缓存，并先解析一次Webhook域名；退出时恢复原来的 socket.getaddrinfo"""
+    loop = asyncio.get_running_loop()
+    # uvloop 通过libuv解析域名，不经过 socket.getaddrinfo，缓存不起作用，预解析只会多查询一次，直接跳过
+    if type(loop).__module__.startswith('uvloop'):
+        yield
+        return
+
+    socket.getaddrinfo = _getaddrinfo_cached
+    try:
+        try:
+            await loop.run_in_executor(None, socket.getaddrinfo, host, port, 0, socket.SOCK_STREAM)
+        except OSError:
+            pass  # 解析失败时由请求本身报告网络错误
+        yield
+    finally:
+        socket.getaddrinfo = _orig_getaddrinfo
+
+
+# 所有请求共用的请求头
+HEADERS = {'Content-Type': 'application/json'}
+
+
+def _text_body(message: str) -> bytes:
+    """编码文本类型的钉钉消息"""
+    return _json_dumps_compact({"msgtype": "text", "text": {"content": message}})
+
+
+def _markdown_body(messages: List[Tuple[str, str]]) -> bytes:
+    """把多条测试消息合并成一条分节的markdown消息"""
+    sections = [
+        f"### {test_name}\n\n" + message.replace('\n', '  \n')
+        for test_name, message in messages
+    ]
+    return _json_dumps_compact({
+        "msgtype": "markdown",
+        "markdown": {
+            "title": "网络监测测试",
+            "text": "\n\n---\n\n".join(sections)
+        }
+    })
+
+
+async def _send(client: httpx.AsyncClient, webhook_url: str, test_name: str, body: bytes) -> Tuple[bool, List[str]]:
+    """发送一条测试消息，返回是否成功和该条消息的输出内容"""
+    output = [f"📤 发送 {test_name} 消息..."]
+    success = False
+
+    try:
+        # 客户端已带 Content-Type: application/json，直接发送预先编码的字节
+        response = await client.post(webhook_url, content=body)
+
+        if response.status_code == 200:
+            reply = response.content
+            # 成功响应固定为 {"errcode":0,"errmsg":"ok"}，先直接匹配字节；匹配不到时才解析JSON
+            result = None if b'"errcode":0' in reply else _json_loads(reply)
+            if result is None or result.get('errcode') == 0:
+                output.append(f"✅ {test_name} 发送成功")
+                success = True
+            else:
+                output.append(f"❌ {test_name} 发送失败: {result.get('errmsg', '未知错误')}")
+        else:
+            output.append(f"❌ {test_name} 发送失败: HTTP {response.status_code}")
+
+    except httpx.RequestError as e:
+        output.append(f"❌ {test_name} 网络错误: {e}")
+    except Exception as e:
+        output.append(f"❌ {test_name} 发生错误: {e}")
+
+    return success, output
+
+
+async def _run_test(out: Callable[[str], None]):
+    """执行测试，所有输出通过out写出"""
     # 从配置文件读取钉钉Webhook地址
     try:
-        with open('config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        webhook_url = config.get('dingtalk_webhook', '')
-
-        if not webhook_url or webhook_url == "YOUR_DINGTALK_WEBHOOK_URL_HERE":
-            print("⚠️ 钉钉Webhook未配置，跳过测试")
-            print("请在 config.json 中设置正确的 dingtalk_webhook 地址")
-            return
-    except FileNotFoundError:
-        print("❌ 配置文件 config.json 不存在")
+        config = load_config()
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        if isinstance(e, FileNotFoundError):
+            out("❌ 配置文件 config.json 不存在")
+        else:
+            out("❌ 配置文件格式错误")
         return
-    except json.JSONDecodeError:
-        print("❌ 配置文件格式错误")
+
+    # 地址未配置或格式不对时直接返回，不再构造测试消息
+    webhook_url = config.get('dingtalk_webhook', '')
+    if not webhook_url or webhook_url == "YOUR_DINGTALK_WEBHOOK_URL_HERE":
+        out("⚠️ 钉钉Webhook未配置，跳过测试")
+        out("请在 config.json 中设置正确的 dingtalk_webhook 地址")
+        return
+    if not WEBHOOK_VALID_RE.match(webhook_url):
+        out(f"⚠️ 钉钉Webhook地址格式不正确，跳过测试: {webhook_url}")
+        out("地址应为 https://oapi.dingtalk.com/robot/send?access_token=...")
         return
-    
-    # 测试消息
-    client_name = "测试客户端"
-    test_message = (
-        f"🧪 网络监测工具测试消息\n\n"
-        f"客户端: {client_name}\n"
-        f"这是一条来自网络监测工具的测试通知。\n"
-        f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        f"功能: 钉钉Webhook集成测试\n"
-        f"状态: 测试正常"
-    )
-    
+
+    # 测试消息（同一次测试的两条消息使用同一个时间，固定部分在模块加载时已拼好）
+    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    test_message = _TEST_PREFIX + ts + _TEST_SUFFIX
+
     # 高延迟测试消息
-    high_latency_message = (
-        f"⚠️ 网络监测报警\n\n"
-        f"客户端: {client_name}\n"
-        f"目标: 8.8.8.8\n"
-        f"状态: 高延迟警告\n"
-        f"当前延迟: 150.25ms\n"
-        f"阈值: 100ms\n"
-        f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    )
-    
+    high_latency_message = _HIGH_LATENCY_PREFIX + ts
+
     messages = [
         ("基础测试", test_message),
         ("高延迟报警", high_latency_message),
     ]
-    
-    print("🚀 开始测试钉钉Webhook通知...")
-    print(f"📡 Webhook地址: {webhook_url}")
-    print()
-    
+
+    # DINGTALK_TEST_BATCH=1 时合并为一条markdown消息发送，只占用一次请求和一次限流额度
+    if os.getenv('DINGTALK_TEST_BATCH') == '1':
+        sends = [(" + ".join(name for name, _ in messages), _markdown_body(messages))]
+    else:
+        sends = [(test_name, _text_body(message)) for test_name, message in messages]
+
+    out("🚀 开始测试钉钉Webhook通知...")
+    out(f"📡 Webhook地址: {webhook_url}")
+    out("")
+
+    # 默认事件循环下先解析一次Webhook域名，随后的并发请求直接使用缓存结果，不再各自查询DNS
+    parts = urlsplit(webhook_url)
+
+    # 各条消息相互独立，在同一个事件循环中并发发送，总耗时取决于最慢的一次请求
+    # 所有消息共用一个客户端和连接池，保持长连接，只做一次TCP和TLS握手；退出时关闭连接
+    async with _dns_cache(parts.hostname, parts.port or 443), httpx.AsyncClient(
+        http2=_HTTP2,
+        headers=HEADERS,
+        timeout=10,
+        limits=httpx.Limits(max_connections=4, max_keepalive_connections=1),
+    ) as client:
+        # DINGTALK_WARMUP=1 时先发一个HEAD请求建立TCP和TLS连接（返回405也无妨），
+        # 之后的测试消息只体现钉钉服务端的处理延迟
+        if os.getenv('DINGTALK_WARMUP') == '1':
+            try:
+                await client.head(f"{parts.scheme}://{parts.netloc}{parts.path}", timeout=3)
+            except httpx.HTTPError:
+                pass
+
+        # 限制同时进行的请求数，消息增多时也不会一下子打满钉钉的限流额度
+        limit = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+        async def send_limited(test_name: str, body: bytes) -> Tuple[bool, List[str]]:
+            async with limit:
+                return await _send(client, webhook_url, test_name, body)
+
+        if hasattr(asyncio, 'TaskGroup'):
+            # Python 3.11+ 使用结构化并发，退出代码块时所有任务都已结束
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(send_limited(test_name, body)) for test_name, body in sends]
+            results = [task.result() for task in tasks]
+        else:
+            results = await asyncio.gather(
+                *(send_limited(test_name, body) for test_name, body in sends),
+                return_exceptions=True,
+            )
+
+    # 按消息顺序输出各自的结果，避免并发打印交错
     success_count = 0
-    
-    for test_name, message in messages:
-        print(f"📤 发送 {test_name} 消息...")
-        
-        try:
-            payload = {
-                "msgtype": "text",
-                "text": {
-                    "content": message
-                }
-            }
-            
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.post(webhook_url, 
-                                   data=json.dumps(payload), 
-                                   headers=headers, 
-                                   timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('errcode') == 0:
-                    print(f"✅ {test_name} 发送成功")
-                    success_count += 1
-                else:
-                    print(f"❌ {test_name} 发送失败: {result.get('errmsg', '未知错误')}")
-            else:
-                print(f"❌ {test_name} 发送失败: HTTP {response.status_code}")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ {test_name} 网络错误: {e}")
-        except Exception as e:
-            print(f"❌ {test_name} 发生错误: {e}")
-        
-        print()
-    
-    print(f"🎯 测试完成: {success_count}/{len(messages)} 条消息发送成功")
-    
-    if success_count == len(messages):
-        print("🎉 所有测试通过！钉钉Webhook集成正常工作。")
+    for (test_name, _), result in zip(sends, results):
+        if isinstance(result, BaseException):
+            result = (False, [f"📤 发送 {test_name} 消息...", f"❌ {test_name} 发生错误: {result}"])
+        success, output = result
+        out('\n'.join(output))
+        out("")
+        success_count += success
+
+    out(f"🎯 测试完成: {success_count}/{len(sends)} 条消息发送成功")
+
+    if success_count == len(sends):
+        out("🎉 所有测试通过！钉钉Webhook集成正常工作。")
     else:
-        print("⚠️ 部分测试失败，请检查Webhook配置。")
+        out("⚠️ 部分测试失败，请检查Webhook配置。")
+
+
+async def test_dingtalk_webhook():
+    """测试钉钉Webhook通知"""
+    # 交互运行时逐行打印以便观察进度；输出被重定向时先缓存，结束后一次性写出
+    if sys.stdout.isatty():
+        await _run_test(print)
+        return
+
+    buf: List[str] = []
+    try:
+        await _run_test(buf.append)
+    finally:
+        if buf:
+            sys.stdout.write('\n'.join(buf) + '\n')
 
 if __name__ == "__main__":
-    test_dingtalk_webhook()
\ No newline at end of file
+    # 安装了 uvloop 时使用更快的事件循环（不支持Windows，导入失败时使用默认循环）
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+
+    if uvloop is not None and sys.version_info >= (3, 12):
+        asyncio.run(test_dingtalk_webhook(), loop_factory=uvloop.new_event_loop)
+    else:
+        if uvloop is not None:
+            uvloop.install()
+        asyncio.run(test_dingtalk_webhook())